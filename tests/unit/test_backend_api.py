@@ -0,0 +1,279 @@
+"""
+Tests for the ContractQuard web backend API.
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "web" / "backend"
+
+
+@pytest.fixture(scope="module")
+def backend(tmp_path_factory):
+    """Import the backend against a throwaway SQLite database."""
+    db_path = tmp_path_factory.mktemp("backend") / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # Kept on the path while the tests run: spawned analysis workers import
+    # the analyzers from it
+    sys.path.insert(0, str(BACKEND_DIR))
+    try:
+        import database
+        import main
+
+        database.init_db()
+        yield main
+    finally:
+        sys.path.remove(str(BACKEND_DIR))
+
+
+@pytest.fixture(scope="module")
+def client(backend):
+    """HTTP client for the backend app."""
+    from fastapi.testclient import TestClient
+
+    with TestClient(backend.app, base_url="http://localhost") as test_client:
+        yield test_client
+
+
+def upload(client, filename, source):
+    """Analyze a contract and return the response JSON."""
+    response = client.post("/api/analyze", files={"file": (filename, source.encode())})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_history_cursor_pages_through_all_rows(client):
+    """Keyset pagination visits every analysis exactly once, newest first."""
+    uploaded = [
+        upload(client, f"page{i}.sol", f"contract Page{i} {{ function f() public {{}} }}\n")["analysis_id"]
+        for i in range(5)
+    ]
+
+    full = [a["analysis_id"] for a in client.get("/api/analyses").json()["analyses"]]
+
+    seen = []
+    cursor = None
+    for _ in range(10):
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/analyses", params=params).json()
+        assert page["total"] == len(full)
+        seen.extend(a["analysis_id"] for a in page["analyses"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert seen == full
+    assert len(seen) == len(set(seen))
+    assert set(uploaded) <= set(seen)
+
+
+def test_history_orders_same_second_uploads_newest_first(client):
+    """Analyses stored within one second still come back in upload order."""
+    uploaded = [
+        upload(client, f"order{i}.sol", f"contract Order{i} {{}}\n")["analysis_id"]
+        for i in range(3)
+    ]
+
+    newest = [a["analysis_id"] for a in client.get("/api/analyses", params={"limit": 3}).json()["analyses"]]
+    assert newest == uploaded[::-1]
+
+
+@pytest.mark.parametrize("limit", [0, -1, 10_000])
+def test_history_rejects_out_of_range_limits(client, limit):
+    """Page sizes outside 1..MAX_HISTORY_LIMIT are validation errors, not server errors."""
+    response = client.get("/api/analyses", params={"limit": limit})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("cursor", ["missing", str(uuid.uuid4())])
+def test_history_rejects_unknown_cursor(client, cursor):
+    """A cursor that names no analysis is a client error, whatever its form."""
+    response = client.get("/api/analyses", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_finding_ids_match_stored_findings(backend, client):
+    """The ids in the analyze response are the ids the findings are stored under."""
+    source = "contract Ids { function f() public { tx.origin; selfdestruct(payable(msg.sender)); } }\n"
+    result = upload(client, "ids.sol", source)
+    assert result["findings"]
+
+    with backend._results_lock:
+        backend.analysis_results_json.pop(result["analysis_id"], None)
+    stored = client.get(f"/api/analysis/{result['analysis_id']}").json()
+
+    assert sorted(f["id"] for f in stored["findings"]) == sorted(f["id"] for f in result["findings"])
+
+
+def test_code_is_served_as_plain_text(client):
+    """The original source comes back verbatim, not wrapped in JSON."""
+    source = 'contract Code { string s = "quote \\" and newline"; }\n'
+    analysis_id = upload(client, "code.sol", source)["analysis_id"]
+
+    response = client.get(f"/api/analysis/{analysis_id}/code")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == source
+
+
+@pytest.mark.parametrize("path", ["/api/analysis/{}", "/api/analysis/{}/code", "/api/analysis/{}/export"])
+@pytest.mark.parametrize("analysis_id", ["missing", str(uuid.uuid4())])
+def test_unknown_analysis_is_404(client, path, analysis_id):
+    """Reading a missing analysis is a 404, not a server error, whatever the id's form."""
+    response = client.get(path.format(analysis_id))
+    assert response.status_code == 404
+
+
+def test_websocket_close_is_quiet(backend, client, monkeypatch):
+    """A client closing its socket is cleaned up without logging an error."""
+    errors = []
+    monkeypatch.setattr(backend.logger, "error", lambda *args: errors.append(args))
+
+    with client.websocket_connect("ws://localhost/ws") as ws:
+        ws.send_json({"type": "subscribe", "analysis_id": "quiet"})
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json()["type"] == "pong"
+
+    assert errors == []
+    assert not backend.manager.active_connections
+    assert "quiet" not in backend.manager.rooms
+
+
+def test_analysis_events_reach_the_upload_channel(client):
+    """A socket subscribed to the channel sent with the upload receives its events."""
+    with client.websocket_connect("ws://localhost/ws") as ws:
+        ws.send_json({"type": "subscribe", "analysis_id": "upload-channel"})
+        # The pong confirms the subscription was processed before uploading
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json()["type"] == "pong"
+
+        response = client.post(
+            "/api/analyze",
+            files={"file": ("events.sol", b"contract Events {}\n")},
+            data={"channel": "upload-channel"},
+        )
+        assert response.status_code == 200
+        analysis_id = response.json()["analysis_id"]
+
+        started = ws.receive_json()
+        complete = ws.receive_json()
+
+    assert (started["type"], started["analysis_id"]) == ("analysis_started", analysis_id)
+    assert (complete["type"], complete["analysis_id"]) == ("analysis_complete", analysis_id)
+
+
+def test_export_and_code_served_before_the_write_lands(backend, client, monkeypatch):
+    """Until the background write commits, export and code come from the pending record."""
+    persist = backend._persist_analysis
+    deferred = []
+    monkeypatch.setattr(backend, "_persist_analysis", lambda **kwargs: deferred.append(kwargs))
+
+    source = "contract Pending { function f() public { tx.origin; } }\n"
+    analysis_id = upload(client, "pending.sol", source)["analysis_id"]
+    assert analysis_id in backend.pending_analyses
+
+    code = client.get(f"/api/analysis/{analysis_id}/code")
+    assert code.status_code == 200
+    assert code.text == source
+    pending_export = client.get(f"/api/analysis/{analysis_id}/export")
+    assert pending_export.status_code == 200
+
+    # Let the write land; the pending record is dropped and the stored
+    # export matches what was served before it
+    persist(**deferred.pop())
+    assert analysis_id not in backend.pending_analyses
+    stored_export = client.get(f"/api/analysis/{analysis_id}/export")
+    assert stored_export.status_code == 200
+
+    assert pending_export.json() == stored_export.json()
+
+
+def test_migrations_upgrade_a_baseline_database(backend, tmp_path):
+    """The tracked baseline database gains the current schema and keeps its data."""
+    from sqlalchemy import create_engine, inspect
+
+    import database
+
+    db_path = tmp_path / "baseline.db"
+    shutil.copyfile(BACKEND_DIR / "contractquard.db", db_path)
+    with sqlite3.connect(db_path) as connection:
+        for analysis_id, critical in (("11111111-1111-1111-1111-111111111111", 1), ("22222222-2222-2222-2222-222222222222", 0)):
+            connection.execute(
+                "INSERT INTO analyses (id, filename, file_hash, file_content, language, file_size, "
+                "status, critical_count, high_count, medium_count, created_at) "
+                "VALUES (?, 'old.sol', 'oldhash', 'contract Old {}', 'solidity', 15, 'COMPLETED', ?, 0, 0, "
+                "'2025-01-01 00:00:00')",
+                (analysis_id, critical)
+            )
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    for _ in range(2):
+        with engine.begin() as connection:
+            database.run_migrations(connection)
+
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        assert "file_content" not in {c["name"] for c in inspector.get_columns("analyses")}
+        assert {"ix_analyses_file_hash", "ix_analyses_language", "ix_analyses_created_at_id"} <= {
+            index["name"] for index in inspector.get_indexes("analyses")
+        }
+        assert "ix_findings_analysis_id" in {index["name"] for index in inspector.get_indexes("findings")}
+        assert connection.exec_driver_sql("SELECT * FROM language_stats").fetchall() == [("solidity", 2, 1, 0, 0)]
+        assert connection.exec_driver_sql("SELECT * FROM analysis_sources").fetchall() == [("oldhash", "contract Old {}")]
+    engine.dispose()
+
+
+def test_analysis_recovers_from_a_dead_pool_worker(backend, client):
+    """A pool broken by a dying worker is replaced instead of failing every later upload."""
+    broken = backend._new_analysis_executor()
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+    backend.analysis_executor = broken
+
+    upload(client, "recover.sol", "contract Recover {}\n")
+    assert backend.analysis_executor is not broken
+
+
+def test_duplicate_upload_reuses_the_stored_result(backend, client):
+    """A re-upload answers with the stored analysis and tells the upload's channel."""
+    source = "contract Again {\n    function f() public {}\n}\n"
+    first = upload(client, "again.sol", source)
+    with backend._results_lock:
+        backend.analysis_results_json.pop(first["analysis_id"], None)
+
+    with client.websocket_connect("ws://localhost/ws") as ws:
+        ws.send_json({"type": "subscribe", "analysis_id": "again-channel"})
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json()["type"] == "pong"
+
+        response = client.post(
+            "/api/analyze",
+            files={"file": ("again.sol", source.encode())},
+            data={"channel": "again-channel"},
+        )
+        complete = ws.receive_json()
+
+    again = response.json()
+    assert again["analysis_id"] == first["analysis_id"]
+    assert again["metadata"]["lines_of_code"] == first["metadata"]["lines_of_code"] == 3
+    assert (complete["type"], complete["analysis_id"]) == ("analysis_complete", first["analysis_id"])
+
+
+@pytest.mark.parametrize("path", ["/api/health", "/api/analyses"])
+def test_unlisted_host_is_rejected(client, path):
+    """Requests for a host outside the allow-list are refused on every path."""
+    response = client.get(path, headers={"host": "attacker.example"})
+    assert response.status_code == 400
@@ -2,8 +2,8 @@
 Factory for creating appropriate analyzers based on file type
 """
 
-from typing import Optional, Dict, List
-from .base import BaseAnalyzer
+from typing import Optional, Dict, List, Tuple
+from .base import BaseAnalyzer, AnalysisFinding
 from .solidity_analyzer import SolidityAnalyzer
 from .rust_analyzer import RustAnalyzer
 from .go_analyzer import GoAnalyzer
@@ -51,3 +51,21 @@ class AnalyzerFactory:
 
 # Global factory instance
 analyzer_factory = AnalyzerFactory()
+
+def run_analysis(file_extension: str, filename: str, content: str) -> Tuple[List[AnalysisFinding], int]:
+    """
+    Analyze a file and score its findings using the global factory
+
+    Defined at module level so it can be submitted to a process pool.
+
+    Args:
+        file_extension: File extension (e.g., 'sol', 'rs', 'go')
+        filename: Name of the file being analyzed
+        content: Content of the file
+
+    Returns:
+        Tuple of (findings, risk score)
+    """
+    analyzer = analyzer_factory.get_analyzer(file_extension)
+    findings = analyzer.analyze_file(filename, content)
+    return findings, analyzer.calculate_risk_score(findings)
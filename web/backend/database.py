@@ -3,8 +3,13 @@ Database models and configuration for ContractQuard
 """
 
 import os
-from sqlalchemy import create_engine, Column, String, Integer, Text, DateTime, ForeignKey, DECIMAL, Boolean, JSON
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, Column, String, Integer, Text, DateTime, ForeignKey, DECIMAL, Boolean, JSON, Index, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import sessionmaker, relationship, Session
 from datetime import datetime
 import uuid
@@ -12,8 +17,26 @@ import uuid
 # Database configuration - Use SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./contractquard.db")
 
+# Connection pool settings; SQLite uses its own single-file pool and ignores them
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", "5"))
+
+engine_options = {"echo": os.getenv("DB_ECHO", "false").lower() == "true"}
+if not DATABASE_URL.startswith("sqlite"):
+    engine_options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+
 # Create engine
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(DATABASE_URL, **engine_options)
+
+# Dialect-specific INSERT constructs that support ON CONFLICT upserts
+UPSERT_INSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,15 +44,30 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for models
 Base = declarative_base()
 
+# Postgres generates ids and timestamps in the database; other backends fall
+# back to Python defaults. SQLite's CURRENT_TIMESTAMP only has one-second
+# resolution, which would tie analyses stored in the same second when
+# ordering newest first.
+if engine.dialect.name == "postgresql":
+    ID_TYPE = UUID(as_uuid=False)
+    ID_DEFAULT = {"server_default": text("gen_random_uuid()")}
+    # now() is the server's local time; the naive columns hold UTC everywhere
+    TIMESTAMP_DEFAULT = {"server_default": func.timezone("utc", func.now())}
+    TIMESTAMP_ONUPDATE = {"onupdate": func.timezone("utc", func.now())}
+else:
+    ID_TYPE = String(36)
+    ID_DEFAULT = {"default": lambda: str(uuid.uuid4())}
+    TIMESTAMP_DEFAULT = {"default": datetime.utcnow}
+    TIMESTAMP_ONUPDATE = {"onupdate": datetime.utcnow}
+
 class Analysis(Base):
     """Analysis record in database"""
     __tablename__ = "analyses"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(ID_TYPE, primary_key=True, **ID_DEFAULT)
     filename = Column(String(255), nullable=False)
-    file_hash = Column(String(64), nullable=False)
-    file_content = Column(Text, nullable=True)  # Store original file content
-    language = Column(String(20), nullable=False)
+    file_hash = Column(String(64), nullable=False, index=True)
+    language = Column(String(20), nullable=False, index=True)
     file_size = Column(Integer, nullable=False)
     status = Column(String(20), nullable=False, default="PENDING")
     risk_score = Column(Integer, default=0)
@@ -40,19 +78,29 @@ class Analysis(Base):
     low_count = Column(Integer, default=0)
     info_count = Column(Integer, default=0)
     analysis_duration_ms = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, **TIMESTAMP_DEFAULT)
+    updated_at = Column(DateTime, **TIMESTAMP_DEFAULT, **TIMESTAMP_ONUPDATE)
     
     # Relationships
     findings = relationship("Finding", back_populates="analysis", cascade="all, delete-orphan")
     metrics = relationship("CodeMetrics", back_populates="analysis", uselist=False, cascade="all, delete-orphan")
 
+    # Newest-first history pages seek on (created_at, id)
+    __table_args__ = (Index("ix_analyses_created_at_id", "created_at", "id"),)
+
+class AnalysisSource(Base):
+    """Original file content, stored once per distinct upload"""
+    __tablename__ = "analysis_sources"
+
+    file_hash = Column(String(64), primary_key=True)
+    content = Column(Text, nullable=False)
+
 class Finding(Base):
     """Security finding record"""
     __tablename__ = "findings"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    analysis_id = Column(String(36), ForeignKey('analyses.id'), nullable=False)
+    id = Column(ID_TYPE, primary_key=True, **ID_DEFAULT)
+    analysis_id = Column(ID_TYPE, ForeignKey('analyses.id'), nullable=False, index=True)
     detector_name = Column(String(100), nullable=False)
     severity = Column(String(20), nullable=False)
     category = Column(String(50), nullable=False)
@@ -66,7 +114,7 @@ class Finding(Base):
     impact = Column(String(20), default="MEDIUM")
     cwe_id = Column(Integer)
     references = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, **TIMESTAMP_DEFAULT)
     
     # Relationships
     analysis = relationship("Analysis", back_populates="findings")
@@ -75,8 +123,8 @@ class CodeMetrics(Base):
     """Code quality metrics"""
     __tablename__ = "code_metrics"
     
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    analysis_id = Column(String(36), ForeignKey('analyses.id'), nullable=False)
+    id = Column(ID_TYPE, primary_key=True, **ID_DEFAULT)
+    analysis_id = Column(ID_TYPE, ForeignKey('analyses.id'), nullable=False, index=True)
     lines_of_code = Column(Integer, default=0)
     cyclomatic_complexity = Column(Integer, default=0)
     function_count = Column(Integer, default=0)
@@ -87,6 +135,58 @@ class CodeMetrics(Base):
     # Relationships
     analysis = relationship("Analysis", back_populates="metrics")
 
+class LanguageStat(Base):
+    """Running per-language counters backing the statistics endpoint"""
+    __tablename__ = "language_stats"
+
+    language = Column(String(20), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    critical_with = Column(Integer, nullable=False, default=0)
+    high_with = Column(Integer, nullable=False, default=0)
+    medium_with = Column(Integer, nullable=False, default=0)
+
+def record_language_stat(db: Session, language: str, critical: int, high: int, medium: int):
+    """Count one stored analysis in its language's counters (caller commits)"""
+    values = {
+        "language": language,
+        "total": 1,
+        "critical_with": int(critical > 0),
+        "high_with": int(high > 0),
+        "medium_with": int(medium > 0)
+    }
+    if engine.dialect.name in ("postgresql", "sqlite"):
+        stmt = UPSERT_INSERT[engine.dialect.name](LanguageStat).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LanguageStat.language],
+            set_={
+                "total": LanguageStat.total + stmt.excluded.total,
+                "critical_with": LanguageStat.critical_with + stmt.excluded.critical_with,
+                "high_with": LanguageStat.high_with + stmt.excluded.high_with,
+                "medium_with": LanguageStat.medium_with + stmt.excluded.medium_with
+            }
+        )
+        db.execute(stmt)
+        return
+
+    stat = db.get(LanguageStat, language, with_for_update=True)
+    if stat is None:
+        db.add(LanguageStat(**values))
+    else:
+        stat.total += 1
+        stat.critical_with += values["critical_with"]
+        stat.high_with += values["high_with"]
+        stat.medium_with += values["medium_with"]
+
+def record_source(db: Session, file_hash: str, content: str):
+    """Store an upload's content unless identical content is already stored (caller commits)"""
+    if engine.dialect.name in ("postgresql", "sqlite"):
+        stmt = UPSERT_INSERT[engine.dialect.name](AnalysisSource).values(file_hash=file_hash, content=content)
+        db.execute(stmt.on_conflict_do_nothing(index_elements=[AnalysisSource.file_hash]))
+        return
+
+    if db.get(AnalysisSource, file_hash) is None:
+        db.add(AnalysisSource(file_hash=file_hash, content=content))
+
 # Database dependency
 def get_db() -> Session:
     """Get database session"""
@@ -96,13 +196,39 @@ def get_db() -> Session:
     finally:
         db.close()
 
+def warm_pool():
+    """Open a few pooled connections up front so early requests skip the handshake"""
+    if engine.dialect.name == "sqlite":
+        return
+    connections = [engine.connect() for _ in range(min(DB_POOL_WARM, DB_POOL_SIZE))]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+# Schema changes are Alembic migrations; keep them in step with the models above
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Databases created with create_all before migrations existed have this schema
+BASELINE_REVISION = "0001"
+
+def run_migrations(connection: Connection):
+    """Upgrade the schema on a connection to the latest migration"""
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    config.attributes["connection"] = connection
+    tables = inspect(connection).get_table_names()
+    if "analyses" in tables and "alembic_version" not in tables:
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
 # Create tables
 def create_tables():
-    """Create all database tables"""
-    # Drop and recreate to ensure schema is up to date
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully")
+    """Create or upgrade the database tables, keeping existing data"""
+    with engine.begin() as connection:
+        run_migrations(connection)
+    print("✅ Database schema is up to date")
 
 # Initialize database
 def init_db():
@@ -57,4 +57,18 @@ echo "🐍 Python version: $(python --version)"
 echo "📦 Installed packages:"
 pip list | grep -E "(fastapi|uvicorn|sqlalchemy)" || echo "❌ Core packages not found!"
 
-exec python -m uvicorn main:app --host 0.0.0.0 --port $FINAL_PORT
+# Create the schema once here rather than in every worker at import
+echo "🗄️ Initializing database..."
+python -c "from database import init_db; init_db()"
+export SKIP_DB_INIT=true
+
+# A single web worker by default: WebSocket rooms and the result caches live
+# in each worker's memory, so clients only see events and cached results from
+# the worker that served them. Raise WEB_CONCURRENCY behind sticky sessions.
+# Analyses run in process pools that share the cores out between the web
+# workers (override with ANALYSIS_WORKERS)
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-1}
+echo "👷 Workers: $WEB_CONCURRENCY (analysis processes per worker: ${ANALYSIS_WORKERS:-cores / workers})"
+
+exec python -m uvicorn main:app --host 0.0.0.0 --port $FINAL_PORT \
+    --workers $WEB_CONCURRENCY --loop uvloop --http httptools --no-access-log
@@ -6,40 +6,61 @@ FastAPI application for smart contract security analysis
 import os
 import sys
 import time
+import queue
+import threading
 import logging
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener
 import hashlib
+import codecs
 import re
-from pathlib import Path
+from datetime import datetime
 from typing import Optional, List
 import uvicorn
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
-from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, Request, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, WebSocket, Depends, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.datastructures import MutableHeaders
 from pydantic import BaseModel
-import json
+import orjson
 import asyncio
-from datetime import datetime
+import anyio
 import uuid
 import csv
 import io
-from sqlalchemy.orm import Session
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cachetools import LRUCache
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session, selectinload
 
 # Import our models and analyzers
 from models import AnalysisResponse, HealthResponse, SeverityLevel
-from database import get_db, init_db, Analysis, Finding, CodeMetrics
-from analyzers.analyzer_factory import analyzer_factory
+from database import get_db, init_db, warm_pool, record_language_stat, record_source, SessionLocal, Analysis, AnalysisSource, Finding, CodeMetrics, LanguageStat
+from analyzers.analyzer_factory import analyzer_factory, run_analysis
 
-# Simple logging
-import logging
+# Non-blocking logging: request handlers only enqueue records, the
+# listener thread does the actual stream I/O
 logger = logging.getLogger(__name__)
-
-# Initialize database
-init_db()
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.Queue(-1)
+_log_handler = logging.StreamHandler(sys.stdout)
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+_log_listener = QueueListener(_log_queue, _log_handler)
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener.start()
+
+# Initialize database. Multi-worker launchers create the schema once before
+# starting the workers and set SKIP_DB_INIT so each worker doesn't repeat it
+if os.getenv("SKIP_DB_INIT", "false").lower() != "true":
+    init_db()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -47,47 +68,231 @@ app = FastAPI(
     description="AI-augmented smart contract security analysis API",
     version="0.1.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse
 )
 
-# Security middleware
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=["localhost", "127.0.0.1", "*.contractquard.com", "*.railway.app", "*.vercel.app"]
-)
+@app.on_event("shutdown")
+def stop_log_listener():
+    """Flush queued log records on shutdown"""
+    _log_listener.stop()
+
+# Supported contract file extensions, without the leading dot
+ALLOWED_EXTENSIONS = frozenset({'sol', 'rs', 'go'})
+ALLOWED_EXTENSIONS_LABEL = ', '.join(f'.{ext}' for ext in sorted(ALLOWED_EXTENSIONS))
+
+# Declarations counted for the stored code metrics
+DECLARATION_RE = re.compile(r'(function|contract)\s+\w+', re.IGNORECASE)
+
+# Uploads are read in chunks of this size and rejected once they exceed the limit
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_TEXT_LENGTH = 1_000_000  # 1MB text limit
+# Multipart framing and form fields on top of the file itself
+MAX_UPLOAD_OVERHEAD = 64 * 1024
+
+# Largest history page a client may request
+MAX_HISTORY_LIMIT = 200
+
+# Rejects oversized uploads from their Content-Length before the body is read;
+# chunked uploads without one are still caught by the streaming read
+class UploadSizeLimitMiddleware:
+    upload_paths = frozenset({"/api/analyze"})
+    max_body_size = MAX_FILE_SIZE + MAX_UPLOAD_OVERHEAD
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.upload_paths:
+            for key, value in scope["headers"]:
+                if key == b"content-length":
+                    if value.isdigit() and int(value) > self.max_body_size:
+                        response = ORJSONResponse(
+                            status_code=413,
+                            content={"detail": f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"}
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+
+        await self.app(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Security middleware: trusted hosts as an exact-match set plus wildcard suffixes
+ALLOWED_HOSTS = frozenset({"localhost", "127.0.0.1"})
+ALLOWED_HOST_SUFFIXES = (".contractquard.com", ".railway.app", ".vercel.app")
+
+class HostAllowListMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        host = b""
+        for key, value in scope["headers"]:
+            if key == b"host":
+                host = value
+                break
+        host = host.split(b":", 1)[0].decode("latin-1")
+
+        if host in ALLOWED_HOSTS or host.endswith(ALLOWED_HOST_SUFFIXES):
+            await self.app(scope, receive, send)
+        else:
+            await PlainTextResponse("Invalid host header", status_code=400)(scope, receive, send)
+
+app.add_middleware(HostAllowListMiddleware)
 
 # CORS middleware
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=cors_origins + [
+    allow_origins=frozenset(cors_origins + [
         "http://localhost:3000",
         "http://localhost:3001",
         "http://localhost:5173",
         "https://*.vercel.app",
         "https://contractquard.com",
         "https://*.contractquard.com"
-    ],
+    ]),
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
 
-# Simple request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    print(f"{request.method} {request.url} - {response.status_code} - {process_time:.3f}s")
-    return response
+# Request timing/logging middleware (plain ASGI, no per-request task or streams)
+class TimingMiddleware:
+    # Load-balancer probes are passed straight through, unlogged
+    skip_paths = frozenset({"/api/health"})
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", f"{time.perf_counter() - start:.6f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            logger.info("%s %s - %s - %.3fs", scope["method"], scope["path"], status_code, time.perf_counter() - start)
+
+app.add_middleware(TimingMiddleware)
 
 # Global start time
 start_time = time.time()
 
-# In-memory storage for analysis results (production'da database kullanılır)
-analysis_results = {}
+# The seconds part of the timestamp only changes once a second, so it is cached
+_iso_second = (0, "")
+
+def _iso_now() -> str:
+    """Current UTC time as an ISO 8601 string, without building a datetime"""
+    global _iso_second
+    now = time.time()
+    second = int(now)
+    if second != _iso_second[0]:
+        _iso_second = (second, time.strftime("%Y-%m-%dT%H:%M:%S.", time.gmtime(second)))
+    return "%s%06dZ" % (_iso_second[1], (now - second) * 1_000_000)
+
+def _is_valid_id(value: str) -> bool:
+    """Whether a client-supplied id has the UUID form every stored id has"""
+    # PostgreSQL rejects anything else in a UUID comparison, so such ids are
+    # answered without a query on every backend
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+# CPU-bound analyses run in worker processes so they don't block the event loop.
+# By default the cores are shared out between the web workers, so throughput
+# scales with the machine without each web worker starting a process per core.
+# Spawned rather than forked: forking a process that runs an event loop, a
+# logging thread and pooled connections copies their state.
+WEB_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", max(1, (os.cpu_count() or 1) // WEB_WORKERS)))
+
+def _new_analysis_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+analysis_executor = _new_analysis_executor()
+
+async def run_analysis_in_pool(language: str, filename: str, content: str):
+    """Run an analysis in the process pool, replacing the pool if a worker died"""
+    global analysis_executor
+    loop = asyncio.get_running_loop()
+    executor = analysis_executor
+    try:
+        return await loop.run_in_executor(executor, run_analysis, language, filename, content)
+    except BrokenProcessPool:
+        # A worker that dies (OOM, segfault) breaks the whole pool for good,
+        # so start a new one and retry once; if this analysis kills it again
+        # only this request fails. Concurrent requests replace the pool once.
+        if analysis_executor is executor:
+            logger.error("Analysis worker died; restarting the analysis pool")
+            analysis_executor = _new_analysis_executor()
+            executor.shutdown(wait=False)
+        return await loop.run_in_executor(analysis_executor, run_analysis, language, filename, content)
+
+@app.on_event("shutdown")
+def shutdown_analysis_executor():
+    """Wait for in-flight analyses and stop the worker processes"""
+    analysis_executor.shutdown(wait=True)
+
+# Blocking database work runs in anyio's thread pool, which defaults to 40 threads
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "200"))
+
+@app.on_event("startup")
+async def configure_threadpool():
+    """Raise the worker thread limit used by run_in_threadpool and sync endpoints"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def warm_database_pool():
+    """Pre-open database connections before traffic arrives"""
+    await run_in_threadpool(warm_pool)
+
+# In-memory storage for analysis results (production'da database kullanılır):
+# the serialized JSON, so repeated GETs skip re-encoding. LRU-bounded so
+# long-running workers don't grow without limit, and locked because sync
+# endpoints read it from worker threads
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+analysis_results_json = LRUCache(maxsize=RESULT_CACHE_SIZE)
+_results_lock = threading.Lock()
+
+def cache_analysis_result(analysis_id: str, payload: dict) -> bytes:
+    """Serialize a result payload and cache it, returning the bytes"""
+    body = orjson.dumps(payload)
+    with _results_lock:
+        analysis_results_json[analysis_id] = body
+    return body
+
+def get_cached_result(analysis_id: str) -> Optional[bytes]:
+    """Serialized result from the in-memory cache, if still held"""
+    with _results_lock:
+        return analysis_results_json.get(analysis_id)
+
+# Analyses whose database write is still running, keyed by id, so /export and
+# /code can serve them before the row exists. Entries are dropped once the
+# write finishes (or fails) and only live in the worker that ran the analysis:
+# other workers return 404 until the write has been committed.
+pending_analyses: dict[str, dict] = {}
 
 # Pydantic models
 class AnalysisRequest(BaseModel):
@@ -111,21 +316,58 @@ class HealthResponse(BaseModel):
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: set[WebSocket] = set()
+        # Room (analysis id) -> subscribed sockets, and the reverse mapping
+        # so a disconnect only touches the rooms the socket joined
+        self.rooms: dict[str, set[WebSocket]] = defaultdict(set)
+        self.socket_rooms: dict[WebSocket, set[str]] = defaultdict(set)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        for room in self.socket_rooms.pop(websocket, ()):
+            self._leave(websocket, room)
+
+    def subscribe(self, websocket: WebSocket, room: str):
+        self.rooms[room].add(websocket)
+        self.socket_rooms[websocket].add(room)
+
+    def unsubscribe(self, websocket: WebSocket, room: str):
+        self._leave(websocket, room)
+        rooms = self.socket_rooms.get(websocket)
+        if rooms is not None:
+            rooms.discard(room)
+
+    def _leave(self, websocket: WebSocket, room: str):
+        members = self.rooms.get(room)
+        if members is not None:
+            members.discard(websocket)
+            if not members:
+                del self.rooms[room]
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    async def publish(self, room: str, payload: dict):
+        """Send to the sockets subscribed to a room only"""
+        await self._send_all(tuple(self.rooms.get(room, ())), payload)
+
+    async def _send_all(self, connections: tuple, payload: dict):
+        # Serialize once, send to all connections concurrently and drop the
+        # ones whose send failed
+        if not connections:
+            return
+        message = orjson.dumps(payload).decode()
+        results = await asyncio.gather(
+            *(connection.send_text(message) for connection in connections),
+            return_exceptions=True
+        )
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(connection)
 
 manager = ConnectionManager()
 
@@ -136,21 +378,16 @@ async def health_check():
     try:
         # Check analyzer factory availability
         supported_languages = analyzer_factory.get_supported_extensions()
-        analyzer_status = "healthy" if supported_languages else "unavailable"
 
-        # System uptime (simplified)
-        uptime = time.time() - start_time if 'start_time' in globals() else 0
-
-        print("Health check requested")
-
-        return HealthResponse(
-            status=analyzer_status,
-            version="0.1.0",
-            timestamp=datetime.now().isoformat(),
-            uptime_seconds=uptime
-        )
+        # Serialized directly; probes hit this often
+        return ORJSONResponse({
+            "status": "healthy" if supported_languages else "unavailable",
+            "version": "0.1.0",
+            "timestamp": _iso_now(),
+            "uptime_seconds": time.time() - start_time
+        })
     except Exception as e:
-        print(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         raise HTTPException(status_code=503, detail="Service temporarily unavailable")
 
 @app.get("/api/ai-status")
@@ -198,74 +435,135 @@ async def ai_status():
             "total_capabilities": []
         }
 
+def _export_data(analysis: Analysis) -> dict:
+    """Export representation of a stored analysis with its findings and metrics"""
+    findings = analysis.findings
+    code_metrics = analysis.metrics
+
+    return {
+        "analysis_id": analysis.id,
+        "filename": analysis.filename,
+        "language": analysis.language,
+        "file_size": analysis.file_size,
+        "status": analysis.status,
+        "risk_score": analysis.risk_score,
+        "total_findings": analysis.total_findings,
+        "severity_counts": {
+            "critical": analysis.critical_count,
+            "high": analysis.high_count,
+            "medium": analysis.medium_count,
+            "low": analysis.low_count,
+            "info": analysis.info_count
+        },
+        "analysis_duration_ms": analysis.analysis_duration_ms,
+        "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
+        "findings": [
+            {
+                "id": finding.id,
+                "detector": finding.detector_name,
+                "severity": finding.severity,
+                "category": finding.category,
+                "title": finding.title,
+                "description": finding.description,
+                "line_number": finding.line_number,
+                "column_number": finding.column_number,
+                "code_snippet": finding.code_snippet,
+                "recommendation": finding.recommendation,
+                "confidence": finding.confidence,
+                "impact": finding.impact,
+                "cwe_id": finding.cwe_id,
+                "references": []
+            }
+            for finding in findings
+        ],
+        "code_metrics": {
+            "lines_of_code": code_metrics.lines_of_code if code_metrics else None,
+            "cyclomatic_complexity": code_metrics.cyclomatic_complexity if code_metrics else None,
+            "function_count": code_metrics.function_count if code_metrics else None,
+            "contract_count": code_metrics.contract_count if code_metrics else None,
+            "dependency_count": code_metrics.dependency_count if code_metrics else None,
+            "test_coverage": float(code_metrics.test_coverage) if code_metrics and code_metrics.test_coverage else None
+        } if code_metrics else None
+    }
+
+def _pending_export_data(pending: dict) -> dict:
+    """Export representation of an analysis whose database write hasn't landed yet"""
+    severity_counts = pending["severity_counts"]
+    declarations = _count_declarations(pending["content_str"])
+    return {
+        "analysis_id": pending["analysis_id"],
+        "filename": pending["filename"],
+        "language": pending["language"],
+        "file_size": pending["byte_len"],
+        "status": "COMPLETED",
+        "risk_score": pending["risk_score"],
+        "total_findings": len(pending["findings_dict"]),
+        "severity_counts": {
+            "critical": severity_counts["critical_count"],
+            "high": severity_counts["high_count"],
+            "medium": severity_counts["medium_count"],
+            "low": severity_counts["low_count"],
+            "info": severity_counts["info_count"]
+        },
+        "analysis_duration_ms": pending["analysis_duration"],
+        "created_at": pending["created_at"].isoformat(),
+        "findings": [
+            {
+                "id": finding_dict["id"],
+                "detector": finding_dict["detector"],
+                "severity": finding_dict["severity"],
+                "category": finding_obj.category,
+                "title": finding_dict["title"],
+                "description": finding_dict["description"],
+                "line_number": finding_dict["line_number"],
+                "column_number": finding_dict["column"],
+                "code_snippet": finding_dict["code_snippet"],
+                "recommendation": finding_dict["recommendation"],
+                "confidence": finding_dict["confidence"],
+                "impact": finding_dict["impact"],
+                "cwe_id": finding_dict["cwe_id"],
+                "references": []
+            }
+            for finding_obj, finding_dict in zip(pending["findings"], pending["findings_dict"])
+        ],
+        "code_metrics": {
+            "lines_of_code": pending["line_count"],
+            "cyclomatic_complexity": 0,
+            "function_count": declarations["function"],
+            "contract_count": declarations["contract"],
+            "dependency_count": 0,
+            "test_coverage": None
+        }
+    }
+
 @app.get("/api/analysis/{analysis_id}/export")
-async def export_analysis(
+def export_analysis(
     analysis_id: str,
     format: str = "json",
     db: Session = Depends(get_db)
 ):
     """Export analysis results in various formats"""
     try:
-        # Get analysis from database
-        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-        if not analysis:
-            raise HTTPException(status_code=404, detail="Analysis not found")
-
-        # Get findings
-        findings = db.query(Finding).filter(Finding.analysis_id == analysis_id).all()
-
-        # Get code metrics
-        code_metrics = db.query(CodeMetrics).filter(CodeMetrics.analysis_id == analysis_id).first()
-
-        # Prepare export data
-        export_data = {
-            "analysis_id": analysis.id,
-            "filename": analysis.filename,
-            "language": analysis.language,
-            "file_size": analysis.file_size,
-            "status": analysis.status,
-            "risk_score": analysis.risk_score,
-            "total_findings": analysis.total_findings,
-            "severity_counts": {
-                "critical": analysis.critical_count,
-                "high": analysis.high_count,
-                "medium": analysis.medium_count,
-                "low": analysis.low_count,
-                "info": analysis.info_count
-            },
-            "analysis_duration_ms": analysis.analysis_duration_ms,
-            "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
-            "findings": [
-                {
-                    "id": finding.id,
-                    "detector": finding.detector_name,
-                    "severity": finding.severity,
-                    "category": finding.category,
-                    "title": finding.title,
-                    "description": finding.description,
-                    "line_number": finding.line_number,
-                    "column_number": finding.column_number,
-                    "code_snippet": finding.code_snippet,
-                    "recommendation": finding.recommendation,
-                    "confidence": finding.confidence,
-                    "impact": finding.impact,
-                    "cwe_id": finding.cwe_id,
-                    "references": []
-                }
-                for finding in findings
-            ],
-            "code_metrics": {
-                "lines_of_code": code_metrics.lines_of_code if code_metrics else None,
-                "cyclomatic_complexity": code_metrics.cyclomatic_complexity if code_metrics else None,
-                "function_count": code_metrics.function_count if code_metrics else None,
-                "contract_count": code_metrics.contract_count if code_metrics else None,
-                "dependency_count": code_metrics.dependency_count if code_metrics else None,
-                "test_coverage": float(code_metrics.test_coverage) if code_metrics and code_metrics.test_coverage else None
-            } if code_metrics else None
-        }
+        # An analysis still being written is exported from its pending record
+        pending = pending_analyses.get(analysis_id)
+        if pending is not None:
+            export_data = _pending_export_data(pending)
+        else:
+            if not _is_valid_id(analysis_id):
+                raise HTTPException(status_code=404, detail="Analysis not found")
+            # Get analysis with its findings and code metrics from database
+            analysis = (
+                db.query(Analysis)
+                .options(selectinload(Analysis.findings), selectinload(Analysis.metrics))
+                .filter(Analysis.id == analysis_id)
+                .first()
+            )
+            if not analysis:
+                raise HTTPException(status_code=404, detail="Analysis not found")
+            export_data = _export_data(analysis)
 
         if format.lower() == "json":
-            return export_data
+            return ORJSONResponse(export_data)
 
         elif format.lower() == "csv":
             return _export_csv(export_data)
@@ -276,44 +574,48 @@ async def export_analysis(
         else:
             raise HTTPException(status_code=400, detail="Unsupported export format. Use json, csv, or pdf")
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Export failed: {e}")
+        logger.error("Export failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
 
-def _export_csv(data):
-    """Export analysis data as CSV"""
-    output = io.StringIO()
-
-    # Write analysis summary
-    writer = csv.writer(output)
-    writer.writerow(["Analysis Summary"])
-    writer.writerow(["Field", "Value"])
-    writer.writerow(["Analysis ID", data["analysis_id"]])
-    writer.writerow(["Filename", data["filename"]])
-    writer.writerow(["Language", data["language"]])
-    writer.writerow(["File Size (bytes)", data["file_size"]])
-    writer.writerow(["Risk Score", data["risk_score"]])
-    writer.writerow(["Total Findings", data["total_findings"]])
-    writer.writerow(["Analysis Duration (ms)", data["analysis_duration_ms"]])
-    writer.writerow(["Created At", data["created_at"]])
-    writer.writerow([])
-
-    # Write severity counts
-    writer.writerow(["Severity Distribution"])
-    writer.writerow(["Severity", "Count"])
+class _Echo:
+    """File-like object whose write() hands the formatted CSV line back"""
+    def write(self, value):
+        return value
+
+def _csv_rows(data):
+    """Yield the rows of the CSV export"""
+    # Analysis summary
+    yield ["Analysis Summary"]
+    yield ["Field", "Value"]
+    yield ["Analysis ID", data["analysis_id"]]
+    yield ["Filename", data["filename"]]
+    yield ["Language", data["language"]]
+    yield ["File Size (bytes)", data["file_size"]]
+    yield ["Risk Score", data["risk_score"]]
+    yield ["Total Findings", data["total_findings"]]
+    yield ["Analysis Duration (ms)", data["analysis_duration_ms"]]
+    yield ["Created At", data["created_at"]]
+    yield []
+
+    # Severity counts
+    yield ["Severity Distribution"]
+    yield ["Severity", "Count"]
     for severity, count in data["severity_counts"].items():
-        writer.writerow([severity.title(), count])
-    writer.writerow([])
+        yield [severity.title(), count]
+    yield []
 
-    # Write findings
-    writer.writerow(["Security Findings"])
-    writer.writerow([
+    # Findings
+    yield ["Security Findings"]
+    yield [
         "ID", "Detector", "Severity", "Category", "Title", "Description",
         "Line", "Column", "Recommendation", "Confidence", "Impact", "CWE ID"
-    ])
+    ]
 
     for finding in data["findings"]:
-        writer.writerow([
+        yield [
             finding["id"],
             finding["detector"],
             finding["severity"],
@@ -326,40 +628,89 @@ def _export_csv(data):
             finding["confidence"],
             finding["impact"],
             finding["cwe_id"]
-        ])
+        ]
 
-    output.seek(0)
+def _export_csv(data):
+    """Export analysis data as CSV, streamed one encoded row at a time"""
+    writer = csv.writer(_Echo())
 
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode('utf-8')),
+        (writer.writerow(row).encode('utf-8') for row in _csv_rows(data)),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={data['filename']}_analysis.csv"}
     )
 
+# PDF styles are identical for every report, so they are built once on first use
+_pdf_styles = None
+
+def _get_pdf_styles():
+    """Return the shared reportlab styles, importing reportlab on first call"""
+    global _pdf_styles
+    if _pdf_styles is None:
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import TableStyle
+        from reportlab.lib import colors
+
+        styles = getSampleStyleSheet()
+        _pdf_styles = {
+            "sheet": styles,
+            "title": ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=24,
+                spaceAfter=30,
+                textColor=colors.darkblue
+            ),
+            "summary_table": TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 14),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]),
+            "severity_table": TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 12),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]),
+            "finding_table": TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ])
+        }
+    return _pdf_styles
+
 def _export_pdf(data):
     """Export analysis data as PDF"""
     try:
         # Try to import reportlab
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
         from reportlab.lib.units import inch
-        from reportlab.lib import colors
+
+        pdf_styles = _get_pdf_styles()
+        styles = pdf_styles["sheet"]
 
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
         story = []
 
         # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            textColor=colors.darkblue
-        )
-        story.append(Paragraph("ContractQuard Security Analysis Report", title_style))
+        story.append(Paragraph("ContractQuard Security Analysis Report", pdf_styles["title"]))
         story.append(Spacer(1, 20))
 
         # Analysis Summary
@@ -376,16 +727,7 @@ def _export_pdf(data):
         ]
 
         summary_table = Table(summary_data)
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        summary_table.setStyle(pdf_styles["summary_table"])
         story.append(summary_table)
         story.append(Spacer(1, 20))
 
@@ -398,16 +740,7 @@ def _export_pdf(data):
 
         if len(severity_data) > 1:
             severity_table = Table(severity_data)
-            severity_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            severity_table.setStyle(pdf_styles["severity_table"])
             story.append(severity_table)
         else:
             story.append(Paragraph("No security findings detected.", styles['Normal']))
@@ -433,16 +766,7 @@ def _export_pdf(data):
                 ]
 
                 finding_table = Table(finding_details, colWidths=[2*inch, 4*inch])
-                finding_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
+                finding_table.setStyle(pdf_styles["finding_table"])
                 story.append(finding_table)
 
                 # Description
@@ -509,11 +833,172 @@ Severity Distribution:
         headers={"Content-Disposition": f"attachment; filename={data['filename']}_analysis.txt"}
     )
 
-@app.post("/api/analyze", response_model=AnalysisResponse)
-async def analyze_contract(file: UploadFile = File(...)):
+def _analysis_payload(db_analysis: Analysis) -> dict:
+    """Build the analysis response payload from a stored analysis and its findings"""
+    findings_dict = []
+    for finding in db_analysis.findings:
+        findings_dict.append({
+            "id": str(finding.id),
+            "detector": finding.detector_name,
+            "severity": finding.severity,
+            "title": finding.title,
+            "description": finding.description,
+            "line_number": finding.line_number,
+            "column": finding.column_number,
+            "code_snippet": finding.code_snippet,
+            "recommendation": finding.recommendation,
+            "confidence": finding.confidence,
+            "impact": finding.impact,
+            "cwe_id": finding.cwe_id,
+            "references": finding.references or []
+        })
+
+    # Prepare response from database
+    return {
+        "analysis_id": str(db_analysis.id),
+        "status": "completed",
+        "findings": findings_dict,
+        "metadata": {
+            "filename": db_analysis.filename,
+            "file_size": db_analysis.file_size,
+            "total_findings": db_analysis.total_findings,
+            "analysis_duration_ms": db_analysis.analysis_duration_ms,
+            "language": db_analysis.language,
+            "lines_of_code": db_analysis.metrics.lines_of_code if db_analysis.metrics else None,
+            "risk_score": db_analysis.risk_score,
+            "critical_count": db_analysis.critical_count,
+            "high_count": db_analysis.high_count,
+            "medium_count": db_analysis.medium_count,
+            "low_count": db_analysis.low_count,
+            "info_count": db_analysis.info_count
+        },
+        "timestamp": db_analysis.created_at.isoformat()
+    }
+
+def _find_previous_analysis(file_hash: str, filename: str) -> Optional[tuple]:
+    """Return an earlier analysis of the same file, if any, with its serialized result"""
+    db = SessionLocal()
+    try:
+        previous = (
+            db.query(Analysis.id, Analysis.total_findings, Analysis.analysis_duration_ms)
+            .filter(Analysis.file_hash == file_hash, Analysis.filename == filename)
+            .order_by(Analysis.created_at.desc())
+            .first()
+        )
+        if previous is None:
+            return None
+        previous_id = previous.id
+
+        cached = get_cached_result(previous_id)
+        if cached is not None:
+            return previous, cached
+
+        db_analysis = (
+            db.query(Analysis)
+            .options(selectinload(Analysis.findings), selectinload(Analysis.metrics))
+            .filter(Analysis.id == previous_id)
+            .first()
+        )
+        return previous, cache_analysis_result(previous_id, _analysis_payload(db_analysis))
+
+    except Exception as e:
+        logger.warning("Duplicate upload lookup failed: %s", e)
+        return None
+    finally:
+        db.close()
+
+def _count_declarations(content_str: str) -> Counter:
+    """Function and contract declaration counts, from one pass over the source"""
+    return Counter(m.group(1).lower() for m in DECLARATION_RE.finditer(content_str))
+
+def _persist_analysis(analysis_id: str, filename: str, file_hash: str, content_str: str,
+                      language: str, byte_len: int, line_count: int, risk_score: int,
+                      analysis_duration: int, severity_counts: dict, findings: list,
+                      findings_dict: list, created_at: datetime) -> None:
+    """Save an analysis with its findings and metrics; runs in a worker thread"""
+    db = SessionLocal()
+    try:
+        # The source is kept apart from the analysis row, once per distinct upload
+        record_source(db, file_hash, content_str)
+
+        # Create analysis record
+        db_analysis = Analysis(
+            id=analysis_id,
+            filename=filename,
+            file_hash=file_hash,
+            language=language,
+            file_size=byte_len,
+            status="COMPLETED",
+            risk_score=risk_score,
+            total_findings=len(findings_dict),
+            analysis_duration_ms=analysis_duration,
+            created_at=created_at,
+            **severity_counts
+        )
+        db.add(db_analysis)
+        # The parent row must exist before the bulk insert references it
+        db.flush()
+
+        # Create finding records as one executemany INSERT, bypassing the unit of work
+        finding_rows = [
+            {
+                "id": finding_dict["id"],
+                "analysis_id": analysis_id,
+                "detector_name": finding_dict["detector"],
+                "severity": finding_dict["severity"],
+                "category": finding_obj.category,
+                "title": finding_dict["title"],
+                "description": finding_dict["description"],
+                "line_number": finding_dict["line_number"],
+                "column_number": finding_dict["column"],
+                "code_snippet": finding_dict["code_snippet"],
+                "recommendation": finding_dict["recommendation"],
+                "confidence": finding_dict["confidence"],
+                "impact": finding_dict["impact"],
+                "cwe_id": finding_dict["cwe_id"],
+                "references": finding_dict["references"]
+            }
+            for finding_obj, finding_dict in zip(findings, findings_dict)
+        ]
+        if finding_rows:
+            db.execute(insert(Finding), finding_rows)
+
+        # Create code metrics
+        declarations = _count_declarations(content_str)
+        db_metrics = CodeMetrics(
+            analysis_id=analysis_id,
+            lines_of_code=line_count,
+            function_count=declarations["function"],
+            contract_count=declarations["contract"]
+        )
+        db.add(db_metrics)
+
+        # Keep the statistics counters in step with the stored analyses
+        record_language_stat(
+            db, language,
+            severity_counts["critical_count"],
+            severity_counts["high_count"],
+            severity_counts["medium_count"]
+        )
+
+        db.commit()
+        logger.info("Analysis saved to database: %s", analysis_id)
+
+    except Exception as e:
+        logger.error("Failed to persist analysis %s; result is only held in the response cache: %s", analysis_id, e)
+    finally:
+        db.close()
+        pending_analyses.pop(analysis_id, None)
+
+@app.post("/api/analyze", responses={200: {"model": AnalysisResponse}})
+async def analyze_contract(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                           channel: Optional[str] = Form(None)) -> Response:
     """Analyze uploaded smart contract file with comprehensive validation"""
     start_analysis_time = time.time()
     analysis_id = str(uuid.uuid4())
+    # Clients only learn the analysis id from the response, so progress events
+    # go to a channel they picked and subscribed to before uploading
+    room = channel or analysis_id
 
     try:
         # Comprehensive file validation
@@ -521,74 +1006,112 @@ async def analyze_contract(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="Filename is required")
 
         # File extension validation
-        allowed_extensions = {'.sol', '.rs', '.go'}
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in allowed_extensions:
+        _, dot, ext = file.filename.rpartition('.')
+        ext = ext.lower() if dot else ''
+        if ext not in ALLOWED_EXTENSIONS:
             raise HTTPException(
                 status_code=400,
-                detail=f"Unsupported file type '{file_ext}'. Only {', '.join(allowed_extensions)} files are supported."
+                detail=f"Unsupported file type '.{ext}'. Only {ALLOWED_EXTENSIONS_LABEL} files are supported."
             )
 
-        # File size validation (10MB limit)
-        MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
-            )
-
-        # Content validation
+        # Stream the upload, hashing and decoding each chunk while the next one
+        # is awaited; size and line count are tracked on the way so the text is
+        # never rescanned and the raw bytes are never held as a whole
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        hasher = hashlib.sha256()
+        text_parts = []
+        byte_len = 0
+        char_len = 0
+        line_count = 0
+        ends_with_newline = True
         try:
-            content_str = content.decode('utf-8')
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                byte_len += len(chunk)
+                if byte_len > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
+                    )
+                line_count += chunk.count(b"\n")
+                ends_with_newline = chunk.endswith(b"\n")
+                hasher.update(chunk)
+                text = decoder.decode(chunk)
+                char_len += len(text)
+                if char_len > MAX_TEXT_LENGTH:
+                    raise HTTPException(
+                        status_code=413,
+                        detail="File content too large. Maximum 1MB of text allowed"
+                    )
+                text_parts.append(text)
+            text_parts.append(decoder.decode(b"", final=True))
         except UnicodeDecodeError:
             raise HTTPException(
                 status_code=400,
                 detail="File must be valid UTF-8 encoded text"
             )
 
-        # Basic content validation
-        if len(content_str.strip()) == 0:
-            raise HTTPException(status_code=400, detail="File cannot be empty")
+        # Count a final line without a trailing newline
+        if not ends_with_newline:
+            line_count += 1
 
-        if len(content_str) > 1_000_000:  # 1MB text limit
-            raise HTTPException(
-                status_code=413,
-                detail="File content too large. Maximum 1MB of text allowed"
-            )
+        # Text is capped at MAX_TEXT_LENGTH characters during the read, so
+        # joining it inline is cheaper than a hop to a worker thread
+        content_str = "".join(text_parts)
 
-        print(f"Analysis started: {analysis_id} - {file.filename} ({len(content)} bytes)")
+        # Basic content validation
+        if not content_str or content_str.isspace():
+            raise HTTPException(status_code=400, detail="File cannot be empty")
 
-        # Get appropriate analyzer for file type
-        language = file_ext[1:]  # Remove the dot
-        analyzer = analyzer_factory.get_analyzer(language)
+        logger.info("Analysis started: %s - %s (%d bytes)", analysis_id, file.filename, byte_len)
 
-        if not analyzer:
+        # Make sure an analyzer exists for the file type
+        language = ext
+        if not analyzer_factory.is_supported(language):
             raise HTTPException(
                 status_code=400,
                 detail=f"No analyzer available for {language} files"
             )
 
-        # Calculate file hash for caching
-        file_hash = hashlib.sha256(content).hexdigest()
+        # File hash for caching; an identical upload reuses the earlier result
+        file_hash = hasher.hexdigest()
+        previous = await run_in_threadpool(_find_previous_analysis, file_hash, file.filename)
+        if previous is not None:
+            previous_row, body = previous
+            logger.info("Reused analysis result for duplicate upload: %s", file.filename)
+            # Clients waiting on the channel are told the earlier analysis is the result
+            await manager.publish(room, {
+                "type": "analysis_complete",
+                "analysis_id": str(previous_row.id),
+                "status": "completed",
+                "findings_count": previous_row.total_findings,
+                "duration_ms": previous_row.analysis_duration_ms,
+                "timestamp": _iso_now()
+            })
+            return Response(content=body, media_type="application/json")
 
-        # Broadcast analysis start via WebSocket
-        await manager.broadcast(json.dumps({
+        # Notify WebSocket clients subscribed to this analysis
+        await manager.publish(room, {
             "type": "analysis_started",
             "analysis_id": analysis_id,
             "filename": file.filename,
             "language": language,
-            "timestamp": datetime.now().isoformat()
-        }))
-
-        # Perform real analysis
-        findings = analyzer.analyze_file(file.filename, content_str)
-
-        # Convert findings to dict format with enhanced data
-        findings_dict = []
-        for finding in findings:
-            findings_dict.append({
-                "id": str(uuid.uuid4()),
+            "timestamp": _iso_now()
+        })
+
+        # Perform real analysis off the event loop
+        findings, risk_score = await run_analysis_in_pool(language, file.filename, content_str)
+
+        # Convert findings to dict format with enhanced data, then count
+        # severities from the built dicts. Finding ids are derived from the
+        # analysis id so they are stable, fit the UUID id columns and are the
+        # ids the rows are stored under
+        analysis_uuid = uuid.UUID(analysis_id)
+        findings_dict = [
+            {
+                "id": str(uuid.uuid5(analysis_uuid, str(i))),
                 "detector": finding.detector,
                 "severity": finding.severity.value,
                 "title": finding.title,
@@ -597,192 +1120,128 @@ async def analyze_contract(file: UploadFile = File(...)):
                 "column": finding.column,
                 "code_snippet": finding.code_snippet,
                 "recommendation": finding.recommendation,
-                "confidence": getattr(finding, 'confidence', 'HIGH'),
-                "impact": getattr(finding, 'impact', 'MEDIUM'),
-                "cwe_id": getattr(finding, 'cwe_id', None),
-                "references": getattr(finding, 'references', [])
-            })
+                "confidence": finding.confidence,
+                "impact": finding.impact,
+                "cwe_id": finding.cwe_id,
+                "references": finding.references
+            }
+            for i, finding in enumerate(findings)
+        ]
+        sev_counts = Counter(f["severity"] for f in findings_dict)
 
-        # Calculate analysis duration
+        # Calculate analysis duration; one completion timestamp is shared by
+        # the response and the completion notification
         analysis_duration = int((time.time() - start_analysis_time) * 1000)
+        completed_at = _iso_now()
 
         # Prepare enhanced metadata
         severity_counts = {
-            "critical_count": len([f for f in findings_dict if f["severity"] == "CRITICAL"]),
-            "high_count": len([f for f in findings_dict if f["severity"] == "HIGH"]),
-            "medium_count": len([f for f in findings_dict if f["severity"] == "MEDIUM"]),
-            "low_count": len([f for f in findings_dict if f["severity"] == "LOW"]),
-            "info_count": len([f for f in findings_dict if f["severity"] == "INFO"])
+            "critical_count": sev_counts["CRITICAL"],
+            "high_count": sev_counts["HIGH"],
+            "medium_count": sev_counts["MEDIUM"],
+            "low_count": sev_counts["LOW"],
+            "info_count": sev_counts["INFO"]
         }
 
-        # Calculate risk score
-        risk_score = analyzer.calculate_risk_score(findings)
-
-        # Store in database (with fallback to in-memory)
-        try:
-            db = next(get_db())
-
-            # Create analysis record
-            db_analysis = Analysis(
-                id=analysis_id,
-                filename=file.filename,
-                file_hash=file_hash,
-                file_content=content_str,  # Store original content
-                language=language,
-                file_size=len(content),
-                status="COMPLETED",
-                risk_score=risk_score,
-                total_findings=len(findings_dict),
-                analysis_duration_ms=analysis_duration,
-                **severity_counts
-            )
-            db.add(db_analysis)
-
-            # Create finding records
-            for finding_dict in findings_dict:
-                db_finding = Finding(
-                    analysis_id=analysis_id,
-                    detector_name=finding_dict["detector"],
-                    severity=finding_dict["severity"],
-                    category=getattr(findings[findings_dict.index(finding_dict)], 'category', 'Security'),
-                    title=finding_dict["title"],
-                    description=finding_dict["description"],
-                    line_number=finding_dict["line_number"],
-                    column_number=finding_dict["column"],
-                    code_snippet=finding_dict["code_snippet"],
-                    recommendation=finding_dict["recommendation"],
-                    confidence=finding_dict["confidence"],
-                    impact=finding_dict["impact"],
-                    cwe_id=finding_dict["cwe_id"],
-                    references=finding_dict["references"]
-                )
-                db.add(db_finding)
-
-            # Create code metrics
-            db_metrics = CodeMetrics(
-                analysis_id=analysis_id,
-                lines_of_code=len(content_str.splitlines()),
-                function_count=len(re.findall(r'function\s+\w+', content_str, re.IGNORECASE)),
-                contract_count=len(re.findall(r'contract\s+\w+', content_str, re.IGNORECASE))
-            )
-            db.add(db_metrics)
-
-            db.commit()
-            print(f"Analysis saved to database: {analysis_id}")
-
-        except Exception as e:
-            print(f"Database save failed, using in-memory storage: {e}")
+        # Store in database once the response is sent; until the write lands
+        # the result is served from the in-memory cache, and export and code
+        # requests from the pending record
+        persist_args = {
+            "analysis_id": analysis_id,
+            "filename": file.filename,
+            "file_hash": file_hash,
+            "content_str": content_str,
+            "language": language,
+            "byte_len": byte_len,
+            "line_count": line_count,
+            "risk_score": risk_score,
+            "analysis_duration": analysis_duration,
+            "severity_counts": severity_counts,
+            "findings": findings,
+            "findings_dict": findings_dict,
+            # Stored naive UTC like the column default, from the same instant
+            # as the response timestamp
+            "created_at": datetime.fromisoformat(completed_at[:-1])
+        }
+        pending_analyses[analysis_id] = persist_args
+        background_tasks.add_task(_persist_analysis, **persist_args)
 
         # Prepare response
-        response = AnalysisResponse(
-            analysis_id=analysis_id,
-            status="completed",
-            findings=findings_dict,
-            metadata={
+        # Prepare response payload (serialized directly, no model validation pass)
+        payload = {
+            "analysis_id": analysis_id,
+            "status": "completed",
+            "findings": findings_dict,
+            "metadata": {
                 "filename": file.filename,
-                "file_size": len(content),
+                "file_size": byte_len,
                 "total_findings": len(findings_dict),
                 "analysis_duration_ms": analysis_duration,
                 "language": language,
-                "lines_of_code": len(content_str.splitlines()),
+                "lines_of_code": line_count,
                 "risk_score": risk_score,
                 **severity_counts
             },
-            timestamp=datetime.now().isoformat()
-        )
+            "timestamp": completed_at
+        }
 
         # Store analysis result for later retrieval (fallback)
-        analysis_results[analysis_id] = response
+        body = cache_analysis_result(analysis_id, payload)
 
         # Log successful analysis
-        print(f"Analysis completed: {analysis_id} - {len(findings_dict)} findings in {analysis_duration}ms")
+        logger.info("Analysis completed: %s - %d findings in %dms", analysis_id, len(findings_dict), analysis_duration)
 
-        # Broadcast analysis completion via WebSocket
-        await manager.broadcast(json.dumps({
+        # Notify WebSocket clients subscribed to this analysis
+        await manager.publish(room, {
             "type": "analysis_complete",
             "analysis_id": analysis_id,
             "status": "completed",
             "findings_count": len(findings_dict),
             "duration_ms": analysis_duration,
-            "timestamp": datetime.now().isoformat()
-        }))
+            "timestamp": completed_at
+        })
 
-        return response
+        return Response(content=body, media_type="application/json")
 
     except HTTPException:
         # Re-raise HTTP exceptions (validation errors)
         raise
     except UnicodeDecodeError as e:
-        print(f"File encoding error: {e}")
+        logger.error("File encoding error: %s", e)
         raise HTTPException(
             status_code=400,
             detail="File encoding error. Please ensure the file is valid UTF-8 text."
         )
     except Exception as e:
-        print(f"Analysis failed: {e}")
+        logger.error("Analysis failed: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Internal server error during analysis. Please try again later."
         )
 
-@app.get("/api/analysis/{analysis_id}", response_model=AnalysisResponse)
-async def get_analysis_result(analysis_id: str, db: Session = Depends(get_db)):
+@app.get("/api/analysis/{analysis_id}", responses={200: {"model": AnalysisResponse}})
+def get_analysis_result(analysis_id: str, db: Session = Depends(get_db)):
     """Get analysis result by ID"""
     try:
-        # Try database first
-        db_analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+        # Serve already-serialized results straight from memory
+        cached = get_cached_result(analysis_id)
+        if cached is not None:
+            logger.info("Retrieved analysis result from memory: %s", analysis_id)
+            return Response(content=cached, media_type="application/json")
+
+        if not _is_valid_id(analysis_id):
+            raise HTTPException(status_code=404, detail=f"Analysis with ID {analysis_id} not found")
+
+        db_analysis = (
+            db.query(Analysis)
+            .options(selectinload(Analysis.findings), selectinload(Analysis.metrics))
+            .filter(Analysis.id == analysis_id)
+            .first()
+        )
 
         if db_analysis:
-            # Get findings from database
-            db_findings = db.query(Finding).filter(Finding.analysis_id == analysis_id).all()
-
-            findings_dict = []
-            for finding in db_findings:
-                findings_dict.append({
-                    "id": str(finding.id),
-                    "detector": finding.detector_name,
-                    "severity": finding.severity,
-                    "title": finding.title,
-                    "description": finding.description,
-                    "line_number": finding.line_number,
-                    "column": finding.column_number,
-                    "code_snippet": finding.code_snippet,
-                    "recommendation": finding.recommendation,
-                    "confidence": finding.confidence,
-                    "impact": finding.impact,
-                    "cwe_id": finding.cwe_id,
-                    "references": finding.references or []
-                })
-
-            # Prepare response from database
-            response = AnalysisResponse(
-                analysis_id=str(db_analysis.id),
-                status="completed",
-                findings=findings_dict,
-                metadata={
-                    "filename": db_analysis.filename,
-                    "file_size": db_analysis.file_size,
-                    "total_findings": db_analysis.total_findings,
-                    "analysis_duration_ms": db_analysis.analysis_duration_ms,
-                    "language": db_analysis.language,
-                    "risk_score": db_analysis.risk_score,
-                    "critical_count": db_analysis.critical_count,
-                    "high_count": db_analysis.high_count,
-                    "medium_count": db_analysis.medium_count,
-                    "low_count": db_analysis.low_count,
-                    "info_count": db_analysis.info_count
-                },
-                timestamp=db_analysis.created_at.isoformat()
-            )
-
-            print(f"Retrieved analysis result from database: {analysis_id}")
-            return response
-
-        # Fallback to in-memory storage
-        if analysis_id in analysis_results:
-            result = analysis_results[analysis_id]
-            print(f"Retrieved analysis result from memory: {analysis_id}")
-            return result
+            logger.info("Retrieved analysis result from database: %s", analysis_id)
+            return Response(content=cache_analysis_result(analysis_id, _analysis_payload(db_analysis)), media_type="application/json")
 
         # Not found anywhere
         raise HTTPException(
@@ -793,17 +1252,34 @@ async def get_analysis_result(analysis_id: str, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error retrieving analysis result: {e}")
+        logger.error("Error retrieving analysis result: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Internal server error while retrieving analysis result"
         )
 
 @app.get("/api/analyses")
-async def get_analysis_history(limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
-    """Get analysis history with pagination"""
+def get_analysis_history(limit: int = Query(50, ge=1, le=MAX_HISTORY_LIMIT), offset: int = Query(0, ge=0),
+                         cursor: Optional[str] = None,
+                         db: Session = Depends(get_db)):
+    """Get analysis history, newest first; pass next_cursor back to get the following page"""
     try:
-        analyses = db.query(Analysis).order_by(Analysis.created_at.desc()).offset(offset).limit(limit).all()
+        query = db.query(Analysis).order_by(Analysis.created_at.desc(), Analysis.id.desc())
+        if cursor:
+            # Keyset pagination seeks past the last row seen instead of skipping rows.
+            # The cursor is that row's id; its created_at is read in SQL so the
+            # comparison uses the column's stored format on every backend
+            if not _is_valid_id(cursor) or db.query(Analysis.id).filter(Analysis.id == cursor).first() is None:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            cursor_created_at = (
+                db.query(Analysis.created_at).filter(Analysis.id == cursor).scalar_subquery()
+            )
+            query = query.filter(
+                tuple_(Analysis.created_at, Analysis.id) < tuple_(cursor_created_at, cursor)
+            )
+        elif offset:
+            query = query.offset(offset)
+        analyses = query.limit(limit).all()
 
         history = []
         for analysis in analyses:
@@ -823,116 +1299,160 @@ async def get_analysis_history(limit: int = 50, offset: int = 0, db: Session = D
                 "created_at": analysis.created_at.isoformat()
             })
 
-        return {"analyses": history, "total": len(history)}
+        next_cursor = str(analyses[-1].id) if analyses and len(analyses) == limit else None
 
+        # The total across all pages comes from the per-language counters, the
+        # same source as /api/statistics, rather than a scan of the analyses table
+        total = db.query(func.coalesce(func.sum(LanguageStat.total), 0)).scalar()
+
+        return ORJSONResponse({"analyses": history, "total": total, "next_cursor": next_cursor})
+
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error retrieving analysis history: {e}")
+        logger.error("Error retrieving analysis history: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving analysis history")
 
 @app.get("/api/statistics")
-async def get_statistics(db: Session = Depends(get_db)):
+def get_statistics(db: Session = Depends(get_db)):
     """Get analysis statistics"""
     try:
-        total_analyses = db.query(Analysis).count()
-
-        # Get severity distribution
-        critical_count = db.query(Analysis).filter(Analysis.critical_count > 0).count()
-        high_count = db.query(Analysis).filter(Analysis.high_count > 0).count()
-        medium_count = db.query(Analysis).filter(Analysis.medium_count > 0).count()
-
-        # Get language distribution
-        from sqlalchemy import func
-        language_stats = db.query(Analysis.language, func.count(Analysis.id)).group_by(Analysis.language).all()
-
-        return {
+        # Counters are maintained as analyses are stored, so this reads one
+        # row per language instead of scanning the analyses table
+        total_analyses = critical_count = high_count = medium_count = 0
+        language_distribution = {}
+        for stat in db.query(LanguageStat).all():
+            language_distribution[stat.language] = stat.total
+            total_analyses += stat.total
+            critical_count += stat.critical_with
+            high_count += stat.high_with
+            medium_count += stat.medium_with
+
+        return ORJSONResponse({
             "total_analyses": total_analyses,
             "severity_distribution": {
                 "critical": critical_count,
                 "high": high_count,
                 "medium": medium_count
             },
-            "language_distribution": {lang: count for lang, count in language_stats},
+            "language_distribution": language_distribution,
             "supported_languages": analyzer_factory.get_supported_extensions()
-        }
+        })
 
     except Exception as e:
-        print(f"Error retrieving statistics: {e}")
+        logger.error("Error retrieving statistics: %s", e)
         raise HTTPException(status_code=500, detail="Error retrieving statistics")
 
+# Idle sockets are pinged this often, in seconds
+WS_PING_INTERVAL = 30.0
+
+# Reply to unrecognised WebSocket messages, serialized once
+WS_UNKNOWN_MESSAGE = orjson.dumps({"type": "error", "detail": "unknown message type"}).decode()
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates"""
     await manager.connect(websocket)
-    try:
-        while True:
-            try:
-                # Wait for messages with timeout
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
-                message = json.loads(data)
-
-                if message.get("type") == "ping":
-                    await manager.send_personal_message(
-                        json.dumps({"type": "pong", "timestamp": datetime.now().isoformat()}),
-                        websocket
-                    )
-                else:
-                    # Echo message back
-                    await manager.send_personal_message(data, websocket)
 
-            except asyncio.TimeoutError:
-                # Send ping to keep connection alive
+    async def pinger():
+        # Keep idle connections alive without a timer around every receive
+        try:
+            while True:
+                await asyncio.sleep(WS_PING_INTERVAL)
                 await manager.send_personal_message(
-                    json.dumps({"type": "ping", "timestamp": datetime.now().isoformat()}),
+                    orjson.dumps({"type": "ping", "timestamp": _iso_now()}).decode(),
                     websocket
                 )
-            except Exception as e:
-                print(f"WebSocket error: {e}")
-                break
+        except Exception:
+            # The socket is gone; the receive loop below notices and cleans up
+            return
 
-    except WebSocketDisconnect:
+    ping_task = asyncio.create_task(pinger())
+    try:
+        async for data in websocket.iter_text():
+            message = orjson.loads(data)
+            msg_type = message.get("type")
+
+            if msg_type == "ping":
+                await manager.send_personal_message(
+                    orjson.dumps({"type": "pong", "timestamp": _iso_now()}).decode(),
+                    websocket
+                )
+            elif msg_type == "subscribe" and message.get("analysis_id"):
+                manager.subscribe(websocket, message["analysis_id"])
+            elif msg_type == "unsubscribe" and message.get("analysis_id"):
+                manager.unsubscribe(websocket, message["analysis_id"])
+            else:
+                # Unknown traffic gets a fixed reply instead of an echo
+                await manager.send_personal_message(WS_UNKNOWN_MESSAGE, websocket)
+
+    # iter_text() ends quietly when the client closes; anything else is an error
+    except Exception as e:
+        logger.error("WebSocket error: %s", e)
+    finally:
+        ping_task.cancel()
         manager.disconnect(websocket)
 
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=404,
         content={"detail": "Endpoint not found"}
     )
 
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
 
 @app.get("/api/analysis/{analysis_id}/code")
-async def get_analysis_code(analysis_id: str, db: Session = Depends(get_db)):
-    """Get original code content for analysis"""
+def get_analysis_code(analysis_id: str, db: Session = Depends(get_db)):
+    """Get original code content for analysis, as plain text"""
     try:
-        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-        if not analysis:
+        pending = pending_analyses.get(analysis_id)
+        if pending is not None:
+            return PlainTextResponse(pending["content_str"])
+
+        if not _is_valid_id(analysis_id):
             raise HTTPException(status_code=404, detail="Analysis not found")
 
-        # Return the actual stored file content
-        content = analysis.file_content if analysis.file_content else ""
+        row = (
+            db.query(Analysis.id, AnalysisSource.content)
+            .outerjoin(AnalysisSource, AnalysisSource.file_hash == Analysis.file_hash)
+            .filter(Analysis.id == analysis_id)
+            .first()
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Analysis not found")
 
-        return {
-            "analysis_id": analysis_id,
-            "filename": analysis.filename,
-            "language": analysis.language,
-            "content": content
-        }
+        return PlainTextResponse(row.content or "")
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error getting analysis code: {e}")
+        logger.error("Error getting analysis code: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
+    # Prefer uvloop and httptools (shipped with uvicorn[standard]) without
+    # requiring them; reload only in debug since it forces a single worker.
+    # Per-request access logging is handled by TimingMiddleware.
+    # The schema was created when this module loaded, so the app instances
+    # uvicorn imports skip it. One worker by default since WebSocket rooms
+    # and result caches are per process.
+    import importlib.util
+    os.environ["SKIP_DB_INIT"] = "true"
+    debug = os.getenv("DEBUG", "false").lower() == "true"
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
+        port=int(os.getenv("PORT", 8000)),
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        workers=1 if debug else int(os.getenv("WEB_CONCURRENCY", "1")),
+        reload=debug,
+        log_level="info" if debug else "warning",
+        access_log=False
     )
@@ -0,0 +1,35 @@
+"""
+Alembic environment for the ContractQuard backend
+"""
+
+import os
+import sys
+
+from alembic import context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import Base, engine  # noqa: E402
+
+target_metadata = Base.metadata
+
+
+def run_migrations(connection):
+    # SQLite can't alter most column properties in place, so changes to
+    # existing tables are done by copying them
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite"
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+# init_db() hands over its own connection; the alembic CLI opens one from
+# the app's engine
+connection = context.config.attributes.get("connection")
+if connection is not None:
+    run_migrations(connection)
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
@@ -0,0 +1,81 @@
+"""Baseline schema: analyses, findings and code metrics
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+
+Databases created with Base.metadata.create_all before migrations existed
+have exactly this schema; init_db() stamps them at this revision.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "analyses",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("file_hash", sa.String(64), nullable=False),
+        sa.Column("file_content", sa.Text(), nullable=True),
+        sa.Column("language", sa.String(20), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("risk_score", sa.Integer()),
+        sa.Column("total_findings", sa.Integer()),
+        sa.Column("critical_count", sa.Integer()),
+        sa.Column("high_count", sa.Integer()),
+        sa.Column("medium_count", sa.Integer()),
+        sa.Column("low_count", sa.Integer()),
+        sa.Column("info_count", sa.Integer()),
+        sa.Column("analysis_duration_ms", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_table(
+        "findings",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("analysis_id", sa.String(36), sa.ForeignKey("analyses.id"), nullable=False),
+        sa.Column("detector_name", sa.String(100), nullable=False),
+        sa.Column("severity", sa.String(20), nullable=False),
+        sa.Column("category", sa.String(50), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("line_number", sa.Integer(), nullable=False),
+        sa.Column("column_number", sa.Integer()),
+        sa.Column("code_snippet", sa.Text()),
+        sa.Column("recommendation", sa.Text()),
+        sa.Column("confidence", sa.String(20)),
+        sa.Column("impact", sa.String(20)),
+        sa.Column("cwe_id", sa.Integer()),
+        sa.Column("references", sa.JSON()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_table(
+        "code_metrics",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("analysis_id", sa.String(36), sa.ForeignKey("analyses.id"), nullable=False),
+        sa.Column("lines_of_code", sa.Integer()),
+        sa.Column("cyclomatic_complexity", sa.Integer()),
+        sa.Column("function_count", sa.Integer()),
+        sa.Column("contract_count", sa.Integer()),
+        sa.Column("dependency_count", sa.Integer()),
+        sa.Column("test_coverage", sa.DECIMAL(5, 2)),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("code_metrics")
+    op.drop_table("findings")
+    op.drop_table("analyses")
@@ -0,0 +1,157 @@
+"""Indexes, statistics counters, sources table and database-side defaults
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+
+Brings a baseline database up to the current models:
+
+- indexes for the hash lookup, history paging and foreign-key loads
+- language_stats, backfilled from the stored analyses
+- analysis_sources, backfilled from analyses.file_content, which is dropped
+- on PostgreSQL, native UUID ids with gen_random_uuid() defaults and UTC
+  timestamp defaults, since the models no longer generate them in Python
+
+Each step checks the current schema first, so databases that were created
+by create_all at some point in between are upgraded too.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ("ix_analyses_file_hash", "analyses", ["file_hash"]),
+    ("ix_analyses_language", "analyses", ["language"]),
+    ("ix_analyses_created_at_id", "analyses", ["created_at", "id"]),
+    ("ix_findings_analysis_id", "findings", ["analysis_id"]),
+    ("ix_code_metrics_analysis_id", "code_metrics", ["analysis_id"]),
+)
+
+ID_COLUMNS = (
+    ("analyses", "id"),
+    ("findings", "id"),
+    ("findings", "analysis_id"),
+    ("code_metrics", "id"),
+    ("code_metrics", "analysis_id"),
+)
+ID_TABLES = ("analyses", "findings", "code_metrics")
+CHILD_TABLES = ("findings", "code_metrics")
+TIMESTAMP_COLUMNS = (("analyses", "created_at"), ("analyses", "updated_at"), ("findings", "created_at"))
+UTC_NOW = "timezone('utc', now())"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if bind.dialect.name == "postgresql":
+        _upgrade_postgresql_columns(inspector)
+
+    if "language_stats" not in tables:
+        op.create_table(
+            "language_stats",
+            sa.Column("language", sa.String(20), primary_key=True),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("critical_with", sa.Integer(), nullable=False),
+            sa.Column("high_with", sa.Integer(), nullable=False),
+            sa.Column("medium_with", sa.Integer(), nullable=False),
+        )
+        op.execute(
+            "INSERT INTO language_stats (language, total, critical_with, high_with, medium_with) "
+            "SELECT language, COUNT(*), "
+            "SUM(CASE WHEN critical_count > 0 THEN 1 ELSE 0 END), "
+            "SUM(CASE WHEN high_count > 0 THEN 1 ELSE 0 END), "
+            "SUM(CASE WHEN medium_count > 0 THEN 1 ELSE 0 END) "
+            "FROM analyses GROUP BY language"
+        )
+
+    if "analysis_sources" not in tables:
+        op.create_table(
+            "analysis_sources",
+            sa.Column("file_hash", sa.String(64), primary_key=True),
+            sa.Column("content", sa.Text(), nullable=False),
+        )
+
+    if "file_content" in {column["name"] for column in inspector.get_columns("analyses")}:
+        # Identical uploads share a hash, so any one stored copy will do
+        op.execute(
+            "INSERT INTO analysis_sources (file_hash, content) "
+            "SELECT file_hash, MIN(file_content) FROM analyses "
+            "WHERE file_content IS NOT NULL "
+            "AND file_hash NOT IN (SELECT file_hash FROM analysis_sources) "
+            "GROUP BY file_hash"
+        )
+        with op.batch_alter_table("analyses") as batch_op:
+            batch_op.drop_column("file_content")
+
+    # Re-inspect: on SQLite the column drop rebuilt the analyses table
+    inspector = sa.inspect(bind)
+    for name, table, columns in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def _upgrade_postgresql_columns(inspector) -> None:
+    """Switch ids to native UUIDs and generate ids and timestamps in the database"""
+    id_type = next(c["type"] for c in inspector.get_columns("analyses") if c["name"] == "id")
+    if not isinstance(id_type, sa.Uuid):
+        # The foreign keys have to go while both sides change type
+        for table in CHILD_TABLES:
+            for foreign_key in inspector.get_foreign_keys(table):
+                op.drop_constraint(foreign_key["name"], table, type_="foreignkey")
+        for table, column in ID_COLUMNS:
+            op.alter_column(
+                table, column,
+                type_=postgresql.UUID(as_uuid=False),
+                postgresql_using=f"{column}::uuid"
+            )
+        for table in CHILD_TABLES:
+            op.create_foreign_key(f"{table}_analysis_id_fkey", table, "analyses", ["analysis_id"], ["id"])
+
+    for table in ID_TABLES:
+        op.alter_column(table, "id", server_default=sa.text("gen_random_uuid()"))
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=sa.text(UTC_NOW))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
+
+    with op.batch_alter_table("analyses") as batch_op:
+        batch_op.add_column(sa.Column("file_content", sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE analyses SET file_content = "
+        "(SELECT content FROM analysis_sources WHERE analysis_sources.file_hash = analyses.file_hash)"
+    )
+    op.drop_table("analysis_sources")
+    op.drop_table("language_stats")
+
+    if bind.dialect.name == "postgresql":
+        for table, column in TIMESTAMP_COLUMNS:
+            op.alter_column(table, column, server_default=None)
+        for table in CHILD_TABLES:
+            op.drop_constraint(f"{table}_analysis_id_fkey", table, type_="foreignkey")
+        for table, column in ID_COLUMNS:
+            op.alter_column(
+                table, column,
+                type_=sa.String(36),
+                server_default=None,
+                postgresql_using=f"{column}::text"
+            )
+        for table in CHILD_TABLES:
+            op.create_foreign_key(f"{table}_analysis_id_fkey", table, "analyses", ["analysis_id"], ["id"])
@@ -53,8 +53,7 @@ export default function EnhancedAnalysisResults() {
       // Fetch code content
       const codeResponse = await fetch(`http://localhost:8000/api/analysis/${analysisId}/code`)
       if (codeResponse.ok) {
-        const codeData = await codeResponse.json()
-        setFileContent(codeData.content)
+        setFileContent(await codeResponse.text())
       }
     } catch (err) {
       console.error('Error fetching analysis:', err)
@@ -40,8 +40,7 @@ export default function AnalysisResultsPage() {
       try {
         const codeResponse = await fetch(`http://localhost:8000/api/analysis/${analysisId}/code`)
         if (codeResponse.ok) {
-          const codeData = await codeResponse.json()
-          setFileContent(codeData.content)
+          setFileContent(await codeResponse.text())
         }
       } catch (err) {
         console.error('Failed to fetch code content:', err)
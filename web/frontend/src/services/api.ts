@@ -48,10 +48,13 @@ export const apiService = {
     return response.data
   },
 
-  // Upload and analyze file
-  async analyzeFile(file: File): Promise<AnalysisResponse> {
+  // Upload and analyze file; progress events go to the WebSocket channel, if given
+  async analyzeFile(file: File, channel?: string): Promise<AnalysisResponse> {
     const formData = new FormData()
     formData.append('file', file)
+    if (channel) {
+      formData.append('channel', channel)
+    }
 
     const response = await api.post<AnalysisResponse>('/api/analyze', formData, {
       headers: {
@@ -86,10 +89,11 @@ export const apiService = {
   },
 
   // Get list of analyses
-  async getAnalyses(params?: { limit?: number; offset?: number }): Promise<{ analyses: AnalysisResponse[]; total: number }> {
+  async getAnalyses(params?: { limit?: number; offset?: number; cursor?: string }): Promise<{ analyses: AnalysisResponse[]; total: number; next_cursor: string | null }> {
     const queryParams = new URLSearchParams()
     if (params?.limit) queryParams.append('limit', params.limit.toString())
     if (params?.offset) queryParams.append('offset', params.offset.toString())
+    if (params?.cursor) queryParams.append('cursor', params.cursor)
 
     const response = await api.get(`/api/analyses?${queryParams.toString()}`)
     return response.data